@@ -0,0 +1,102 @@
+"""
+Shared YAML config loading for the YOLOv10 tools.
+Parsed configs are cached per process and mirrored to a JSON sidecar file.
+"""
+
+import functools
+import json
+import os
+from typing import Dict, Any
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as _SafeLoader  # libyaml C extension
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_dumps(obj: Any) -> bytes:
+    """Serialize obj to UTF-8 JSON, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj).encode('utf-8')
+
+
+def _json_loads(data: bytes) -> Any:
+    """Parse UTF-8 JSON, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+@functools.lru_cache(maxsize=32)
+def _cached_config(config_path: str, mtime_ns: int, size: int) -> Dict[str, Any]:
+    """
+    Parse a YAML config; the mtime and size arguments invalidate stale cache entries.
+    
+    A JSON sidecar (``<config>.cache.json``) is kept next to the YAML file so
+    later processes can skip YAML parsing while the config is unchanged. It
+    records the mtime and size of the YAML it was built from and is only used
+    when both match exactly, since copies made with ``cp -p``, ``rsync -t`` or
+    ``tar -x`` can replace the config with a file that looks older.
+    """
+    cache_path = config_path + '.cache.json'
+    source = {'mtime_ns': mtime_ns, 'size': size}
+    try:
+        with open(cache_path, 'rb') as f:
+            cached = _json_loads(f.read())
+        if cached.get('source') == source:
+            config = cached['config']
+            # JSON object keys are always strings; class ids are ints in YAML
+            if config.get('class_labels'):
+                config['class_labels'] = {int(k): v for k, v in config['class_labels'].items()}
+            return config
+    except (OSError, ValueError, AttributeError, KeyError):
+        pass
+    
+    with open(config_path, 'r') as f:
+        config = yaml.load(f, Loader=_SafeLoader)
+    
+    # Write to a temporary file and rename it into place, so another process
+    # never reads a half-written sidecar
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        data = _json_dumps({'source': source, 'config': config})
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, cache_path)
+    except (OSError, TypeError):
+        # Read-only filesystem or non-JSON-serializable values: skip the sidecar
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+    
+    return config
+
+
+def load_config(config_path: str) -> Dict[str, Any]:
+    """
+    Load a YAML config, cached per (absolute path, mtime, size).
+    
+    The returned dict is shared by every caller that loads the same file and
+    must be treated as read-only.
+    
+    Args:
+        config_path: Path to the YAML file
+        
+    Returns:
+        Parsed configuration dictionary
+        
+    Raises:
+        FileNotFoundError: If the config file does not exist
+    """
+    abs_path = os.path.abspath(config_path)
+    stat = os.stat(abs_path)
+    return _cached_config(abs_path, stat.st_mtime_ns, stat.st_size)
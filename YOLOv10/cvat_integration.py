@@ -5,16 +5,46 @@ This script converts YOLOv8 predictions to CVAT-compatible XML format.
 """
 
 import argparse
-import json
+import io
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, TextIO, Tuple
+from xml.sax.saxutils import escape
 
-import yaml
+import numpy as np
+from config_loader import load_config
 from yolov10_service import YOLOv10Service
 
+# Opening of every CVAT document, up to and including the root element
+_XML_HEAD = '<?xml version="1.0" encoding="utf-8"?>\n<annotations>'
+
+# Closing tags after the last shape of an annotation, and of the document
+_ANNOTATION_CLOSE_XML = '\n      </shapes>\n    </annotation>'
+_XML_TAIL = '\n  </annotations>\n</annotations>'
+
+# XML spelling of boolean fields
+_BOOL_STR = {True: 'true', False: 'false', None: 'false'}
+
+# Image file extensions picked up by --images-dir
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tiff'}
+
+
+def _annotation_open_xml(annotation: Dict[str, Any]) -> str:
+    """Render an annotation's opening fields up to its <shapes> element."""
+    return (
+        f'\n    <annotation>'
+        f'\n      <id>{annotation["id"]}</id>'
+        f'\n      <job_id>{annotation["job_id"]}</job_id>'
+        f'\n      <frame>{annotation["frame"]}</frame>'
+        f'\n      <filename>{escape(annotation["filename"])}</filename>'
+        f'\n      <width>{annotation["width"]}</width>'
+        f'\n      <height>{annotation["height"]}</height>'
+        f'\n      <shapes>'
+    )
+
 
 class CVATIntegration:
     """CVAT integration for converting YOLOv10 predictions to CVAT XML format."""
@@ -30,12 +60,41 @@ class CVATIntegration:
         self.config = self._load_config(config_path)
         self.yolo_service = None
         
+        # Label list and static task fields are identical for every image,
+        # so build them once and share them across CVAT documents
+        self._labels_meta = [
+            {'name': class_label, 'color': '#000000', 'attributes': []}
+            for class_label in self.config['class_labels'].values()
+        ]
+        self._task_template = {
+            'id': 1,
+            'name': 'YOLOv10 Auto-Annotation',
+            'size': 1,
+            'mode': 'annotation',
+            'overlap': 0,
+            'bugtracker': '',
+            'start_frame': 0,
+            'stop_frame': 0,
+            'frame_filter': '',
+            'z_order': False,
+            'image_quality': 95,
+            'labels': self._labels_meta
+        }
+        self._labels_xml = self._render_labels_xml(self._labels_meta)
+        self._meta_xml_template = self._build_meta_xml_template()
+        
+        # Output directories already created by this instance
+        self._mkdir_cache = set()
+        
     def _load_config(self, config_path: str) -> Dict[str, Any]:
-        """Load configuration from YAML file."""
+        """
+        Load configuration from YAML file.
+        
+        Parsed configs are cached per (path, mtime), so the returned dict is
+        shared between instances and must be treated as read-only.
+        """
         try:
-            with open(config_path, 'r') as f:
-                config = yaml.safe_load(f)
-            return config
+            return load_config(config_path)
         except FileNotFoundError:
             print(f"Error: Config file {config_path} not found.")
             sys.exit(1)
@@ -59,19 +118,97 @@ class CVATIntegration:
         Returns:
             Dictionary with CVAT-compatible annotation data
         """
+        image_info, detections = self.predict(image_path)
+        
+        # Convert to CVAT format
+        cvat_annotations = self._convert_to_cvat_format(image_info, detections)
+        
+        return cvat_annotations
+    
+    def predict(self, image_path: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        Perform prediction without building the CVAT dictionary.
+        
+        Args:
+            image_path: Path to the input image
+            
+        Returns:
+            Tuple of (image information, list of detections)
+        """
         if self.yolo_service is None:
             self.initialize_yolo_service()
         
         # Get image info
-        image_info = self.yolo_service.get_image_info(image_path)
+        image_info = self._get_image_info(image_path)
         
         # Perform prediction
         detections = self.yolo_service.predict(image_path)
         
-        # Convert to CVAT format
-        cvat_annotations = self._convert_to_cvat_format(image_info, detections)
+        return image_info, detections
+    
+    def predict_and_convert_batch(self, image_paths: List[str],
+                                  batch_size: int = 8) -> List[Dict[str, Any]]:
+        """
+        Perform batched prediction and convert each image to CVAT format.
         
-        return cvat_annotations
+        Args:
+            image_paths: Paths to the input images
+            batch_size: Number of images per forward pass
+            
+        Returns:
+            One CVAT-compatible annotation dictionary per input image
+        """
+        return [self._convert_to_cvat_format(image_info, detections)
+                for image_info, detections in self.predict_batch(image_paths, batch_size)]
+    
+    def predict_batch(self, image_paths: List[str],
+                      batch_size: int = 8) -> List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+        """
+        Perform batched prediction without building CVAT dictionaries.
+        
+        Args:
+            image_paths: Paths to the input images
+            batch_size: Number of images per forward pass
+            
+        Returns:
+            List of (image information, list of detections) tuples in input order
+        """
+        if self.yolo_service is None:
+            self.initialize_yolo_service()
+        
+        image_infos = [self._get_image_info(path) for path in image_paths]
+        detections_list = self.yolo_service.predict_batch(image_paths, batch_size)
+        
+        return list(zip(image_infos, detections_list))
+    
+    def predict_frames(self, frames: List[np.ndarray], filenames: List[str], batch_size: int = 8,
+                       raise_errors: bool = False) -> List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+        """
+        Perform batched prediction on already decoded images.
+        
+        Args:
+            frames: BGR image arrays, e.g. uploads decoded in memory
+            filenames: Filename reported in the image information of each frame
+            batch_size: Number of images per forward pass
+            raise_errors: Re-raise model errors instead of returning empty detections
+            
+        Returns:
+            List of (image information, list of detections) tuples in input order
+        """
+        if self.yolo_service is None:
+            self.initialize_yolo_service()
+        
+        image_infos = [
+            {'filename': filename, 'width': frame.shape[1], 'height': frame.shape[0]}
+            for frame, filename in zip(frames, filenames)
+        ]
+        detections_list = self.yolo_service.predict_frames(frames, batch_size, raise_errors)
+        
+        return list(zip(image_infos, detections_list))
+    
+    def _get_image_info(self, image_path: str) -> Dict[str, Any]:
+        """Get image information from the file header via the YOLO service."""
+        return self.yolo_service.get_image_info(image_path)
     
     def _convert_to_cvat_format(self, image_info: Dict[str, Any], 
                                detections: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -85,63 +222,26 @@ class CVATIntegration:
         Returns:
             CVAT-compatible annotation data
         """
+        now_iso = datetime.now().isoformat()
         cvat_data = {
             'version': '1.1',
             'meta': {
-                'task': {
-                    'id': 1,
-                    'name': 'YOLOv10 Auto-Annotation',
-                    'size': 1,
-                    'mode': 'annotation',
-                    'overlap': 0,
-                    'bugtracker': '',
-                    'created': datetime.now().isoformat(),
-                    'updated': datetime.now().isoformat(),
-                    'start_frame': 0,
-                    'stop_frame': 0,
-                    'frame_filter': '',
-                    'z_order': False,
-                    'image_quality': 95,
-                    'labels': []
-                },
-                'dumped': datetime.now().isoformat()
+                'task': self._build_task_meta(now_iso),
+                'dumped': now_iso
             },
             'annotations': []
         }
         
-        # Add labels to meta
-        for class_id, class_label in self.config['class_labels'].items():
-            cvat_data['meta']['task']['labels'].append({
-                'name': class_label,
-                'color': '#000000',
-                'attributes': []
-            })
-        
-        # Create annotation for the image
-        annotation = {
-            'id': 1,
-            'job_id': 1,
-            'frame': 0,
-            'filename': image_info['filename'],
-            'width': image_info['width'],
-            'height': image_info['height'],
-            'shapes': []
-        }
-        
-        # Convert detections to CVAT shapes
-        for i, detection in enumerate(detections):
-            bbox = detection['bbox']
-            x1, y1, x2, y2 = bbox
-            
-            # Convert to CVAT format (x, y coordinates for rectangle)
-            shape = {
-                'id': i + 1,
+        # Convert detections to CVAT shapes: each bbox [x1, y1, x2, y2]
+        # becomes the top-left/bottom-right points
+        shapes = []
+        for shape_id, detection in enumerate(detections, 1):
+            x1, y1, x2, y2 = detection['bbox']
+            shapes.append({
+                'id': shape_id,
                 'type': 'rectangle',
                 'label': detection['label'],
-                'points': [
-                    [x1, y1],  # Top-left
-                    [x2, y2]   # Bottom-right
-                ],
+                'points': [[x1, y1], [x2, y2]],
                 'group_id': 0,
                 'frame': 0,
                 'occluded': False,
@@ -153,31 +253,61 @@ class CVATIntegration:
                         'value': f"{detection['confidence']:.3f}"
                     }
                 ]
-            }
-            annotation['shapes'].append(shape)
+            })
+        
+        # Create annotation for the image
+        annotation = {
+            'id': 1,
+            'job_id': 1,
+            'frame': 0,
+            'filename': image_info['filename'],
+            'width': image_info['width'],
+            'height': image_info['height'],
+            'shapes': shapes
+        }
         
         cvat_data['annotations'].append(annotation)
         
         return cvat_data
     
+    def _build_task_meta(self, timestamp: str) -> Dict[str, Any]:
+        """
+        Build the CVAT task metadata block.
+        
+        The label list is shared by reference with every other document
+        built by this instance and must not be mutated.
+        """
+        task = dict(self._task_template)
+        task['created'] = timestamp
+        task['updated'] = timestamp
+        return task
+    
     def save_cvat_xml(self, cvat_data: Dict[str, Any], output_path: str):
         """
         Save CVAT data to XML file.
         
+        The document is streamed to disk element by element, so memory use
+        does not grow with the number of shapes.
+        
         Args:
             cvat_data: CVAT annotation data
             output_path: Path to save the XML file
         """
-        xml_content = self._generate_cvat_xml(cvat_data)
-        
         # Create output directory if it doesn't exist
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        self._ensure_output_dir(output_path)
         
         with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(xml_content)
+            self._write_cvat_xml(cvat_data, f)
         
         print(f"CVAT annotations saved to: {output_path}")
     
+    def _ensure_output_dir(self, output_path: str):
+        """Create the parent directory of output_path once per instance."""
+        directory = os.path.dirname(output_path)
+        if directory and directory not in self._mkdir_cache:
+            os.makedirs(directory, exist_ok=True)
+            self._mkdir_cache.add(directory)
+    
     def _generate_cvat_xml(self, cvat_data: Dict[str, Any]) -> str:
         """
         Generate CVAT XML content.
@@ -188,118 +318,212 @@ class CVATIntegration:
         Returns:
             XML string content
         """
-        xml_lines = [
-            '<?xml version="1.0" encoding="utf-8"?>',
-            '<annotations>',
-            f'  <version>{cvat_data["version"]}</version>',
-            '  <meta>',
-            '    <task>',
-            f'      <id>{cvat_data["meta"]["task"]["id"]}</id>',
-            f'      <name>{cvat_data["meta"]["task"]["name"]}</name>',
-            f'      <size>{cvat_data["meta"]["task"]["size"]}</size>',
-            f'      <mode>{cvat_data["meta"]["task"]["mode"]}</mode>',
-            f'      <overlap>{cvat_data["meta"]["task"]["overlap"]}</overlap>',
-            f'      <bugtracker>{cvat_data["meta"]["task"]["bugtracker"]}</bugtracker>',
-            f'      <created>{cvat_data["meta"]["task"]["created"]}</created>',
-            f'      <updated>{cvat_data["meta"]["task"]["updated"]}</updated>',
-            f'      <start_frame>{cvat_data["meta"]["task"]["start_frame"]}</start_frame>',
-            f'      <stop_frame>{cvat_data["meta"]["task"]["stop_frame"]}</stop_frame>',
-            f'      <frame_filter>{cvat_data["meta"]["task"]["frame_filter"]}</frame_filter>',
-            f'      <z_order>{str(cvat_data["meta"]["task"]["z_order"]).lower()}</z_order>',
-            f'      <image_quality>{cvat_data["meta"]["task"]["image_quality"]}</image_quality>',
-            '      <labels>'
-        ]
+        buffer = io.StringIO()
+        self._write_cvat_xml(cvat_data, buffer)
+        return buffer.getvalue()
+    
+    def _write_cvat_xml(self, cvat_data: Dict[str, Any], out: TextIO):
+        """
+        Stream CVAT XML content to a text stream.
         
-        # Add labels
-        for label in cvat_data['meta']['task']['labels']:
-            xml_lines.extend([
-                '        <label>',
-                f'          <name>{label["name"]}</name>',
-                f'          <color>{label["color"]}</color>',
-                '          <attributes>',
-                '          </attributes>',
-                '        </label>'
-            ])
-        
-        xml_lines.extend([
-            '      </labels>',
-            '    </task>',
-            f'    <dumped>{cvat_data["meta"]["dumped"]}</dumped>',
-            '  </meta>',
-            '  <annotations>'
-        ])
+        Each shape is written as one pre-built chunk; only free-text fields
+        (labels, filenames, attribute names) are escaped.
+        
+        Args:
+            cvat_data: CVAT annotation data
+            out: Writable text stream
+        """
+        out.write(_XML_HEAD)
+        out.write(self._render_meta_xml(cvat_data['version'], cvat_data['meta']['task'],
+                                        cvat_data['meta']['dumped']))
         
         # Add annotations
+        out.write('\n  <annotations>')
         for annotation in cvat_data['annotations']:
-            xml_lines.extend([
-                '    <annotation>',
-                f'      <id>{annotation["id"]}</id>',
-                f'      <job_id>{annotation["job_id"]}</job_id>',
-                f'      <frame>{annotation["frame"]}</frame>',
-                f'      <filename>{annotation["filename"]}</filename>',
-                f'      <width>{annotation["width"]}</width>',
-                f'      <height>{annotation["height"]}</height>',
-                '      <shapes>'
-            ])
+            out.write(_annotation_open_xml(annotation))
             
             # Add shapes
             for shape in annotation['shapes']:
-                xml_lines.extend([
-                    '        <shape>',
-                    f'          <id>{shape["id"]}</id>',
-                    f'          <type>{shape["type"]}</type>',
-                    f'          <label>{shape["label"]}</label>',
-                    '          <points>'
-                ])
-                
-                # Add points
-                for point in shape['points']:
-                    xml_lines.append(f'            <point>{point[0]:.2f},{point[1]:.2f}</point>')
-                
-                xml_lines.extend([
-                    '          </points>',
-                    f'          <group_id>{shape["group_id"]}</group_id>',
-                    f'          <frame>{shape["frame"]}</frame>',
-                    f'          <occluded>{str(shape["occluded"]).lower()}</occluded>',
-                    f'          <outside>{str(shape["outside"]).lower()}</outside>',
-                    f'          <keyframe>{str(shape["keyframe"]).lower()}</keyframe>',
-                    '          <attributes>'
-                ])
-                
-                # Add attributes
-                for attr in shape['attributes']:
-                    xml_lines.extend([
-                        '            <attribute>',
-                        f'              <name>{attr["name"]}</name>',
-                        f'              <value>{attr["value"]}</value>',
-                        '            </attribute>'
-                    ])
-                
-                xml_lines.extend([
-                    '          </attributes>',
-                    '        </shape>'
+                points = ''.join([f'\n            <point>{x:.2f},{y:.2f}</point>'
+                                  for x, y in shape['points']])
+                attributes = ''.join([
+                    f'\n            <attribute>'
+                    f'\n              <name>{escape(attr["name"])}</name>'
+                    f'\n              <value>{attr["value"]}</value>'
+                    f'\n            </attribute>'
+                    for attr in shape['attributes']
                 ])
+                out.write(
+                    f'\n        <shape>'
+                    f'\n          <id>{shape["id"]}</id>'
+                    f'\n          <type>{shape["type"]}</type>'
+                    f'\n          <label>{escape(shape["label"])}</label>'
+                    f'\n          <points>{points}'
+                    f'\n          </points>'
+                    f'\n          <group_id>{shape["group_id"]}</group_id>'
+                    f'\n          <frame>{shape["frame"]}</frame>'
+                    f'\n          <occluded>{_BOOL_STR[shape["occluded"]]}</occluded>'
+                    f'\n          <outside>{_BOOL_STR[shape["outside"]]}</outside>'
+                    f'\n          <keyframe>{_BOOL_STR[shape["keyframe"]]}</keyframe>'
+                    f'\n          <attributes>{attributes}'
+                    f'\n          </attributes>'
+                    f'\n        </shape>'
+                )
             
-            xml_lines.extend([
-                '      </shapes>',
-                '    </annotation>'
-            ])
+            out.write(_ANNOTATION_CLOSE_XML)
+        
+        out.write(_XML_TAIL)
+    
+    def save_detections_xml(self, image_info: Dict[str, Any],
+                            detections: List[Dict[str, Any]], output_path: str):
+        """
+        Save detections straight to a CVAT XML file.
+        
+        Equivalent to ``save_cvat_xml(_convert_to_cvat_format(...))`` but
+        skips building the intermediate CVAT dictionary.
+        
+        Args:
+            image_info: Image information dictionary
+            detections: List of YOLOv10 detection results
+            output_path: Path to save the XML file
+        """
+        # Check the image information before opening the file, so a bad
+        # image raises without leaving a truncated XML file behind
+        missing = [key for key in ('filename', 'width', 'height') if key not in image_info]
+        if missing:
+            raise ValueError(f"Image information is missing {', '.join(missing)}")
+        
+        # Create output directory if it doesn't exist
+        self._ensure_output_dir(output_path)
+        
+        with open(output_path, 'w', encoding='utf-8') as f:
+            self._write_cvat_xml_direct(image_info, detections, f)
+        
+        print(f"CVAT annotations saved to: {output_path}")
+    
+    def _write_cvat_xml_direct(self, image_info: Dict[str, Any],
+                               detections: List[Dict[str, Any]], out: TextIO):
+        """
+        Stream CVAT XML for one image directly from detections.
+        
+        Args:
+            image_info: Image information dictionary
+            detections: List of YOLOv10 detection results
+            out: Writable text stream
+        """
+        now_iso = datetime.now().isoformat()
+        out.write(_XML_HEAD)
+        out.write(self._meta_xml_template.format(created=now_iso, updated=now_iso, dumped=now_iso))
+        out.write('\n  <annotations>')
+        out.write(_annotation_open_xml({'id': 1, 'job_id': 1, 'frame': 0, **image_info}))
+        
+        # Each bbox contributes its top-left and bottom-right points
+        for shape_id, detection in enumerate(detections, 1):
+            x1, y1, x2, y2 = detection['bbox']
+            out.write(
+                f'\n        <shape>'
+                f'\n          <id>{shape_id}</id>'
+                f'\n          <type>rectangle</type>'
+                f'\n          <label>{escape(detection["label"])}</label>'
+                f'\n          <points>'
+                f'\n            <point>{x1:.2f},{y1:.2f}</point>'
+                f'\n            <point>{x2:.2f},{y2:.2f}</point>'
+                f'\n          </points>'
+                f'\n          <group_id>0</group_id>'
+                f'\n          <frame>0</frame>'
+                f'\n          <occluded>false</occluded>'
+                f'\n          <outside>false</outside>'
+                f'\n          <keyframe>true</keyframe>'
+                f'\n          <attributes>'
+                f'\n            <attribute>'
+                f'\n              <name>confidence</name>'
+                f'\n              <value>{detection["confidence"]:.3f}</value>'
+                f'\n            </attribute>'
+                f'\n          </attributes>'
+                f'\n        </shape>'
+            )
+        
+        out.write(_ANNOTATION_CLOSE_XML)
+        out.write(_XML_TAIL)
+    
+    def _build_meta_xml_template(self) -> str:
+        """
+        Render the version and meta blocks once as a str.format template.
         
-        xml_lines.extend([
-            '  </annotations>',
-            '</annotations>'
-        ])
+        Only the timestamps change between documents, so they are left as
+        ``{created}``, ``{updated}`` and ``{dumped}`` placeholders.
         
-        return '\n'.join(xml_lines)
+        Returns:
+            XML fragment that follows the opening root element
+        """
+        fields = ('created', 'updated', 'dumped')
+        sentinels = {field: f'\x00{field}\x00' for field in fields}
+        
+        task = dict(self._task_template, created=sentinels['created'],
+                    updated=sentinels['updated'])
+        template = self._render_meta_xml('1.1', task, sentinels['dumped'])
+        
+        template = template.replace('{', '{{').replace('}', '}}')
+        for field in fields:
+            template = template.replace(sentinels[field], f'{{{field}}}')
+        return template
+    
+    def _render_meta_xml(self, version: str, task: Dict[str, Any], dumped: str) -> str:
+        """Render the version and meta blocks shared by both XML writers."""
+        # The shared label list was rendered once at construction
+        if task['labels'] is self._labels_meta:
+            labels_xml = self._labels_xml
+        else:
+            labels_xml = self._render_labels_xml(task['labels'])
+        
+        return (
+            f'\n  <version>{version}</version>'
+            f'\n  <meta>'
+            f'\n    <task>'
+            f'\n      <id>{task["id"]}</id>'
+            f'\n      <name>{escape(task["name"])}</name>'
+            f'\n      <size>{task["size"]}</size>'
+            f'\n      <mode>{task["mode"]}</mode>'
+            f'\n      <overlap>{task["overlap"]}</overlap>'
+            f'\n      <bugtracker>{escape(task["bugtracker"])}</bugtracker>'
+            f'\n      <created>{task["created"]}</created>'
+            f'\n      <updated>{task["updated"]}</updated>'
+            f'\n      <start_frame>{task["start_frame"]}</start_frame>'
+            f'\n      <stop_frame>{task["stop_frame"]}</stop_frame>'
+            f'\n      <frame_filter>{escape(task["frame_filter"])}</frame_filter>'
+            f'\n      <z_order>{_BOOL_STR[task["z_order"]]}</z_order>'
+            f'\n      <image_quality>{task["image_quality"]}</image_quality>'
+            f'\n      <labels>{labels_xml}'
+            f'\n      </labels>'
+            f'\n    </task>'
+            f'\n    <dumped>{dumped}</dumped>'
+            f'\n  </meta>'
+        )
+    
+    @staticmethod
+    def _render_labels_xml(labels: List[Dict[str, Any]]) -> str:
+        """Render the <label> entries of the task metadata."""
+        return ''.join(
+            f'\n        <label>'
+            f'\n          <name>{escape(label["name"])}</name>'
+            f'\n          <color>{label["color"]}</color>'
+            f'\n          <attributes>'
+            f'\n          </attributes>'
+            f'\n        </label>'
+            for label in labels
+        )
 
 
 def main():
     """Main function for command-line usage."""
     parser = argparse.ArgumentParser(description="CVAT Integration for YOLOv10 Auto-Annotation")
-    parser.add_argument("--image", required=True, help="Path to input image")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--image", help="Path to input image")
+    source.add_argument("--images-dir", help="Directory of input images to annotate in batches")
     parser.add_argument("--config", default="config.yaml", help="Path to config file")
     parser.add_argument("--model", help="Path to YOLOv10 model (overrides config)")
-    parser.add_argument("--output", help="Output XML file path")
+    parser.add_argument("--output", help="Output XML file path (output directory with --images-dir)")
+    parser.add_argument("--batch-size", type=int, default=8, help="Images per forward pass with --images-dir")
     
     args = parser.parse_args()
     
@@ -310,9 +534,12 @@ def main():
     model_path = args.model if args.model else None
     cvat_integration.initialize_yolo_service(model_path)
     
+    if args.images_dir:
+        return _annotate_directory(cvat_integration, args)
+    
     # Process image
     print(f"Processing image: {args.image}")
-    cvat_data = cvat_integration.predict_and_convert(args.image)
+    image_info, detections = cvat_integration.predict(args.image)
     
     # Determine output path
     if args.output:
@@ -324,18 +551,65 @@ def main():
         output_path = os.path.join(output_dir, f"{image_name}_annotations.xml")
     
     # Save CVAT XML
-    cvat_integration.save_cvat_xml(cvat_data, output_path)
+    cvat_integration.save_detections_xml(image_info, detections, output_path)
     
     # Print summary
-    annotation = cvat_data['annotations'][0]
     print(f"\nAnnotation Summary:")
-    print(f"  Image: {annotation['filename']} ({annotation['width']}x{annotation['height']})")
-    print(f"  Objects detected: {len(annotation['shapes'])}")
+    print(f"  Image: {image_info['filename']} ({image_info['width']}x{image_info['height']})")
+    print(f"  Objects detected: {len(detections)}")
+    
+    for detection in detections:
+        print(f"    - {detection['label']} (confidence: {detection['confidence']:.3f})")
+    
+    return image_info, detections
+
+
+def _annotate_directory(cvat_integration: CVATIntegration, args: argparse.Namespace):
+    """Annotate every image in a directory, running inference in batches."""
+    image_paths = sorted(
+        os.path.join(args.images_dir, name) for name in os.listdir(args.images_dir)
+        if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+    )
+    output_dir = args.output or cvat_integration.config.get('output_dir', 'annotations')
+    
+    print(f"Processing {len(image_paths)} images from: {args.images_dir}")
+    results = cvat_integration.predict_batch(image_paths, args.batch_size)
+    
+    # Images whose header could not be read have no image information; report
+    # and skip them instead of letting one bad file abort the whole run
+    annotated = []
+    for image_path, (image_info, detections) in zip(image_paths, results):
+        if image_info:
+            annotated.append((image_path, image_info, detections))
+        else:
+            print(f"Skipping unreadable image: {image_path}")
+    
+    # Name outputs by stem as in single-image mode, but keep the extension
+    # when two images share a stem (bus.jpg and bus.png) so neither is overwritten
+    stems = [os.path.splitext(os.path.basename(image_path))[0] for image_path, _, _ in annotated]
+    shared_stems = {stem for stem in stems if stems.count(stem) > 1}
+    
+    def output_path_for(image_path):
+        stem, extension = os.path.splitext(os.path.basename(image_path))
+        image_name = f"{stem}_{extension[1:]}" if stem in shared_stems else stem
+        return os.path.join(output_dir, f"{image_name}_annotations.xml")
+    
+    def save_one(item):
+        image_path, image_info, detections = item
+        cvat_integration.save_detections_xml(image_info, detections, output_path_for(image_path))
+    
+    # Inference stays serialized above; only XML generation and disk writes
+    # are spread across threads so file I/O overlaps with XML building
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        list(executor.map(save_one, annotated))
     
-    for shape in annotation['shapes']:
-        print(f"    - {shape['label']} (confidence: {shape['attributes'][0]['value']})")
+    total = sum(len(detections) for _, _, detections in annotated)
+    print(f"\nAnnotated {len(annotated)} images ({total} objects detected)")
+    skipped = len(results) - len(annotated)
+    if skipped:
+        print(f"Skipped {skipped} unreadable image(s)")
     
-    return cvat_data
+    return results
 
 
 if __name__ == "__main__":
@@ -6,16 +6,69 @@ Upgraded from YOLOv8 to YOLOv10 for improved performance and accuracy.
 """
 
 import argparse
+import functools
 import json
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Tuple, Any
+from typing import List, Dict, Tuple, Any, Iterator
 
 import cv2
 import numpy as np
+import torch
 from ultralytics import YOLO
-import yaml
+from config_loader import load_config
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# EXIF orientations that rotate the image by 90 degrees (cv2.imread applies them)
+_TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+@functools.lru_cache(maxsize=1024)
+def _header_image_size(image_path: str, mtime_ns: int) -> Tuple[int, int]:
+    """Read (width, height) from the image header; the mtime argument invalidates stale entries."""
+    with Image.open(image_path) as image:
+        width, height = image.size
+        if image.getexif().get(0x0112) in _TRANSPOSED_ORIENTATIONS:
+            width, height = height, width
+    return width, height
+
+
+def read_image_size(image_path: str) -> Tuple[int, int]:
+    """
+    Get the (width, height) cv2.imread would produce for an image.
+    
+    Only the file header is parsed when Pillow is installed and understands
+    the format; otherwise the image is fully decoded with OpenCV.
+    
+    Args:
+        image_path: Path to the image
+        
+    Returns:
+        Tuple of (width, height)
+    """
+    if Image is not None:
+        try:
+            return _header_image_size(image_path, os.stat(image_path).st_mtime_ns)
+        except (OSError, ValueError):
+            pass
+    
+    img = cv2.imread(image_path)
+    if img is None:
+        raise ValueError(f"Could not read image: {image_path}")
+    
+    height, width = img.shape[:2]
+    return width, height
 
 
 class YOLOv10Service:
@@ -31,14 +84,17 @@ class YOLOv10Service:
         """
         self.model_path = model_path
         self.config = self._load_config(config_path)
+        self._predict_args = self._build_predict_args()
         self.model = self._load_model()
+        # Labels from the config win; the model's own class names cover every other id
+        self._labels_by_id = self._build_label_list(
+            {**(getattr(self.model, 'names', None) or {}), **(self.config.get('class_labels') or {})})
+        self.warmup()
         
     def _load_config(self, config_path: str) -> Dict[str, Any]:
-        """Load configuration from YAML file."""
+        """Load configuration from YAML file (cached per path and mtime, shared read-only)."""
         try:
-            with open(config_path, 'r') as f:
-                config = yaml.safe_load(f)
-            return config
+            return load_config(config_path)
         except FileNotFoundError:
             print(f"Warning: Config file {config_path} not found. Using default settings.")
             return {
@@ -54,16 +110,146 @@ class YOLOv10Service:
                 }
             }
     
+    def warmup(self, runs: int = None):
+        """
+        Run blank images through the model so the first real call is not the slow one.
+        
+        Args:
+            runs: Number of blank inferences; defaults to model_config.warmup
+        """
+        model_config = self.config.get('model_config', {})
+        if runs is None:
+            runs = model_config.get('warmup', 0)
+        if not runs:
+            return
+        
+        imgsz = model_config.get('imgsz', 640)
+        blank = np.zeros((imgsz, imgsz, 3), dtype=np.uint8)
+        try:
+            for _ in range(runs):
+                self._run_model(blank)
+        except Exception as e:
+            print(f"Warning: YOLOv10 warmup failed: {e}")
+    
+    @staticmethod
+    def _build_label_list(class_labels: Dict[Any, str]) -> List[str]:
+        """Flatten the class_labels mapping into a list indexed by class id."""
+        ids = [int(class_id) for class_id in class_labels]
+        labels = [f"class_{class_id}" for class_id in range(max(ids, default=-1) + 1)]
+        for class_id, class_label in class_labels.items():
+            labels[int(class_id)] = class_label
+        return labels
+    
     def _load_model(self) -> YOLO:
-        """Load the YOLOv10 model."""
+        """Load the YOLOv10 model, using an exported runtime copy when configured."""
         try:
-            model = YOLO(self.model_path)
-            print(f"YOLOv10 model loaded successfully from {self.model_path}")
+            model_path = self._exported_model_path()
+            model = YOLO(model_path, task='detect')
+            
+            if model_path != self.model_path:
+                # Exported models are built for one input size, and TensorRT
+                # engines carry their own precision
+                self._predict_args['imgsz'] = self.config['model_config'].get('imgsz', 640)
+                if model_path.endswith('.engine'):
+                    self._predict_args.pop('half', None)
+            elif self._on_cuda():
+                # NHWC weights line up with tensor-core convolution kernels
+                model.model.to(memory_format=torch.channels_last)
+            
+            if self._on_cuda():
+                # Inputs keep one shape per call, so let cuDNN benchmark and
+                # cache the fastest convolution algorithms
+                torch.backends.cudnn.benchmark = True
+                torch.set_float32_matmul_precision('high')
+            
+            print(f"YOLOv10 model loaded successfully from {model_path}")
             return model
         except Exception as e:
             print(f"Error loading YOLOv10 model: {e}")
             sys.exit(1)
     
+    def _exported_model_path(self) -> str:
+        """
+        Return the model file to load, exporting the PyTorch weights once if needed.
+        
+        With ``model_config.export`` set to ``onnx``, ``openvino`` or ``engine``
+        (TensorRT), the export is written next to the ``.pt`` file and reused
+        until the weights (mtime or size) or the export settings change. ``auto`` picks TensorRT on GPU and ONNX
+        Runtime on CPU. Without it, or if the export fails, the ``.pt`` file
+        is used as-is.
+        
+        Returns:
+            Path of the model file to load
+        """
+        model_config = self.config.get('model_config', {})
+        export_format = model_config.get('export')
+        model_path = Path(self.model_path)
+        if not export_format or model_path.suffix != '.pt':
+            return self.model_path
+        if export_format == 'auto':
+            # On CPU, ONNX Runtime runs the graph without going through PyTorch
+            export_format = 'engine' if self._on_cuda() else 'onnx'
+        
+        # precision overrides the half flag for exports
+        precision = model_config.get('precision') or ('fp16' if self._predict_args['half'] else 'fp32')
+        
+        # Ultralytics tags INT8 ONNX/OpenVINO exports in their names
+        # (yolov10n_int8.onnx, yolov10n_int8_openvino_model/)
+        stem = model_path.stem
+        if precision == 'int8' and export_format != 'engine':
+            stem = f'{stem}_int8'
+        if export_format == 'openvino':
+            exported_path = model_path.with_name(f'{stem}_openvino_model')
+        else:
+            exported_path = model_path.with_name(f'{stem}.{export_format}')
+        
+        export_args = {
+            'format': export_format,
+            'imgsz': model_config.get('imgsz', 640),
+            'device': self._predict_args['device']
+        }
+        if export_format == 'onnx':
+            export_args['simplify'] = True
+        
+        # int8 needs a calibration dataset (TensorRT keeps its calibration
+        # cache next to the engine)
+        if precision == 'int8':
+            export_args.update(int8=True, data=model_config.get('calibration_data'))
+        else:
+            export_args['half'] = precision == 'fp16'
+        
+        # Build for up to export_batch images per call so predict_batch can use it
+        export_batch = model_config.get('export_batch', 1)
+        if export_batch > 1:
+            export_args.update(batch=export_batch, dynamic=True)
+        
+        # Reuse an earlier export only if it was built from these exact weights
+        # (mtime and size, as copies made with cp -p or rsync -t can replace
+        # them with an older-looking file) and with the same settings
+        try:
+            weights = model_path.stat()
+        except OSError:
+            return self.model_path
+        settings = json.dumps({
+            'export': export_args,
+            'weights': {'mtime_ns': weights.st_mtime_ns, 'size': weights.st_size}
+        }, sort_keys=True)
+        settings_path = exported_path.with_name(f'{exported_path.name}.export.json')
+        try:
+            if exported_path.exists() and settings_path.read_text() == settings:
+                return str(exported_path)
+        except OSError:
+            pass
+        
+        try:
+            print(f"Exporting {model_path} to {export_format} (one-time)...")
+            exported = str(YOLO(self.model_path).export(**export_args))
+            settings_path.write_text(settings)
+            return exported
+        except Exception as e:
+            print(f"Warning: {export_format} export failed ({e}). Using {self.model_path}.")
+            return self.model_path
+    
     def predict(self, image_path: str) -> List[Dict[str, Any]]:
         """
         Perform object detection on an image using YOLOv10.
@@ -75,54 +261,227 @@ class YOLOv10Service:
             List of detection results with bounding boxes, class labels, and confidence scores
         """
         try:
-            # Load and validate image
-            if not os.path.exists(image_path):
-                raise FileNotFoundError(f"Image file not found: {image_path}")
+            # A missing or unreadable file makes the model raise, so no
+            # separate existence check (and extra stat) is needed
+            return self._predict_source(image_path)
             
-            # Get model configuration
-            model_config = self.config.get('model_config', {})
+        except Exception as e:
+            print(f"Error during YOLOv10 prediction: {e}")
+            return []
+    
+    def predict_frame(self, frame: np.ndarray) -> List[Dict[str, Any]]:
+        """
+        Perform object detection on an already decoded image.
+        
+        The array is handed to the model as-is, so callers holding pixels in
+        memory (video frames, uploads) skip the encode/write/read/decode trip.
+        
+        Args:
+            frame: BGR image array of shape (H, W, 3), as returned by cv2
+            
+        Returns:
+            List of detection results with bounding boxes, class labels, and confidence scores
+        """
+        try:
+            return self._predict_source(frame)
+        except Exception as e:
+            print(f"Error during YOLOv10 prediction: {e}")
+            return []
+    
+    def predict_batch(self, image_paths: List[str], batch_size: int = 8) -> List[List[Dict[str, Any]]]:
+        """
+        Perform object detection on several images, batching them through the model.
+        
+        Args:
+            image_paths: Paths to the input images
+            batch_size: Number of images per forward pass
             
-            # Perform prediction with YOLOv10
-            results = self.model(
-                image_path, 
-                conf=self.config['confidence_threshold'], 
-                iou=self.config['iou_threshold'],
-                device=model_config.get('device', 'auto'),
-                half=model_config.get('half', False),
-                max_det=model_config.get('max_det', 300),
-                agnostic_nms=model_config.get('agnostic_nms', False),
-                augment=model_config.get('augment', False)
-            )
+        Returns:
+            One list of detection results per input image, in input order
+        """
+        chunks = [image_paths[start:start + batch_size]
+                  for start in range(0, len(image_paths), batch_size)]
+        all_detections = []
+        
+        # Decode the next chunk on worker threads (cv2 releases the GIL) while
+        # the model runs on the current one; inference stays on this thread
+        with ThreadPoolExecutor(max_workers=min(batch_size, os.cpu_count() or 1)) as pool:
+            pending = [pool.submit(cv2.imread, path) for path in chunks[0]] if chunks else []
+            for index, chunk in enumerate(chunks):
+                frames = [future.result() for future in pending]
+                if index + 1 < len(chunks):
+                    pending = [pool.submit(cv2.imread, path) for path in chunks[index + 1]]
+                all_detections.extend(self._predict_decoded(chunk, frames))
+        
+        return all_detections
+    
+    def predict_frames(self, frames: List[np.ndarray], batch_size: int = 16,
+                       raise_errors: bool = False) -> List[List[Dict[str, Any]]]:
+        """
+        Perform object detection on several decoded images, batching them through the model.
+        
+        Args:
+            frames: BGR image arrays, e.g. consecutive video frames
+            batch_size: Number of frames per forward pass
+            raise_errors: Re-raise model errors instead of returning empty detections
             
-            detections = []
+        Returns:
+            One list of detection results per input frame, in input order
+        """
+        return list(self._iter_chunks(frames, batch_size, raise_errors))
+    
+    def predict_frames_iter(self, frames: List[np.ndarray],
+                            batch_size: int = 16) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Lazily perform object detection on several decoded images.
+        
+        Args:
+            frames: BGR image arrays, e.g. consecutive video frames
+            batch_size: Number of frames per forward pass
             
-            for result in results:
-                boxes = result.boxes
-                if boxes is not None:
-                    for box in boxes:
-                        # Get bounding box coordinates
-                        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                        
-                        # Get class and confidence
-                        class_id = int(box.cls[0].cpu().numpy())
-                        confidence = float(box.conf[0].cpu().numpy())
-                        
-                        # Get class label
-                        class_label = self.config['class_labels'].get(class_id, f"class_{class_id}")
-                        
-                        detection = {
-                            'bbox': [float(x1), float(y1), float(x2), float(y2)],
-                            'class_id': class_id,
-                            'label': class_label,
-                            'confidence': confidence
-                        }
-                        detections.append(detection)
+        Yields:
+            One list of detection results per input frame, in input order
+        """
+        yield from self._iter_chunks(frames, batch_size)
+    
+    def _predict_decoded(self, image_paths: List[str],
+                         frames: List[np.ndarray]) -> List[List[Dict[str, Any]]]:
+        """Run one batch over decoded frames; images cv2 could not read go through predict()."""
+        decoded = [frame for frame in frames if frame is not None]
+        batch_detections = iter(self._predict_chunks(decoded, len(decoded) or 1))
+        
+        return [
+            next(batch_detections) if frame is not None else self.predict(image_path)
+            for image_path, frame in zip(image_paths, frames)
+        ]
+    
+    def _predict_chunks(self, sources: List[Any], batch_size: int) -> List[List[Dict[str, Any]]]:
+        """Run the model once per chunk of batch_size sources."""
+        return list(self._iter_chunks(sources, batch_size))
+    
+    def _iter_chunks(self, sources: List[Any], batch_size: int,
+                     raise_errors: bool = False) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Stream results chunk by chunk so each Results object is released once converted.
+        
+        Within a chunk, only sources of the same shape share a model call:
+        Ultralytics letterboxes a mixed-shape batch to a padded square instead
+        of the tighter rectangle it uses for one image, which would make an
+        image's detections depend on the other images batched with it.
+        """
+        for start in range(0, len(sources), batch_size):
+            chunk = sources[start:start + batch_size]
+            groups = {}
+            for index, source in enumerate(chunk):
+                groups.setdefault(getattr(source, 'shape', None), []).append(index)
             
-            return detections
+            if len(groups) == 1:
+                yield from self._run_chunk(chunk, raise_errors)
+                continue
             
+            detections = [None] * len(chunk)
+            for indices in groups.values():
+                group = [chunk[index] for index in indices]
+                for index, group_detections in zip(indices, self._run_chunk(group, raise_errors)):
+                    detections[index] = group_detections
+            yield from detections
+    
+    def _run_chunk(self, chunk: List[Any], raise_errors: bool) -> Iterator[List[Dict[str, Any]]]:
+        """Run one model call over a chunk, yielding one detection list per source."""
+        produced = 0
+        try:
+            for result in self._run_model(chunk, batch=len(chunk), stream=True):
+                yield self._result_to_detections(result)
+                produced += 1
         except Exception as e:
-            print(f"Error during YOLOv10 prediction: {e}")
+            if raise_errors:
+                raise
+            print(f"Error during YOLOv10 batch prediction: {e}")
+            # Keep one entry per source even when the chunk fails part way through
+            for _ in range(len(chunk) - produced):
+                yield []
+    
+    def _predict_source(self, source) -> List[Dict[str, Any]]:
+        """Run the model on one path or array and flatten its results into detections."""
+        detections = []
+        for result in self._run_model(source, stream=True):
+            detections.extend(self._result_to_detections(result))
+        return detections
+    
+    def _build_predict_args(self) -> Dict[str, Any]:
+        """Resolve the configured inference settings once for every model call."""
+        model_config = self.config.get('model_config', {})
+        
+        device = self._resolve_device(model_config.get('device', 'auto'))
+        
+        predict_args = {
+            'conf': self.config['confidence_threshold'],
+            'iou': self.config['iou_threshold'],
+            'device': device,
+            'half': self._resolve_half(model_config, device),
+            'max_det': model_config.get('max_det', 300),
+            'agnostic_nms': model_config.get('agnostic_nms', False),
+            'augment': model_config.get('augment', False),
+            'verbose': False
+        }
+        
+        # torch.compile support needs a recent Ultralytics, so only pass it when enabled
+        if model_config.get('compile'):
+            predict_args['compile'] = model_config['compile']
+        
+        return predict_args
+    
+    def _on_cuda(self) -> bool:
+        """Whether inference runs on a CUDA device."""
+        return str(self._predict_args['device']).lower() not in ('cpu', 'mps') and torch.cuda.is_available()
+    
+    @staticmethod
+    def _resolve_device(device: Any) -> Any:
+        """Turn 'auto' into a concrete device once: the first GPU if there is one, else CPU."""
+        if str(device).lower() == 'auto':
+            return 0 if torch.cuda.is_available() else 'cpu'
+        return device
+    
+    @staticmethod
+    def _resolve_half(model_config: Dict[str, Any], device: Any) -> bool:
+        """FP16 only runs on CUDA: default to it there and always disable it elsewhere."""
+        on_cuda = str(device).lower() not in ('cpu', 'mps') and torch.cuda.is_available()
+        return on_cuda and bool(model_config.get('half', True))
+    
+    def _run_model(self, source, **kwargs):
+        """
+        Call the YOLOv10 model on a source with the configured inference settings.
+        
+        No inference_mode guard is needed here: with stream=True this only
+        returns a generator, so a decorator's context would close before any
+        inference ran. Ultralytics' BasePredictor.stream_inference applies
+        smart_inference_mode itself, each time the generator is resumed.
+        """
+        return self.model(source, **self._predict_args, **kwargs)
+    
+    def _result_to_detections(self, result) -> List[Dict[str, Any]]:
+        """Convert one Ultralytics result into detection dictionaries."""
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
             return []
+        
+        # Copy each tensor to the host once instead of once per box
+        xyxy = boxes.xyxy.cpu().numpy().tolist()
+        class_ids = boxes.cls.cpu().numpy().astype(np.int64).tolist()
+        confidences = boxes.conf.cpu().numpy().tolist()
+        
+        labels = self._labels_by_id
+        num_labels = len(labels)
+        
+        return [
+            {
+                'bbox': bbox,
+                'class_id': class_id,
+                'label': labels[class_id] if class_id < num_labels else f"class_{class_id}",
+                'confidence': confidence
+            }
+            for bbox, class_id, confidence in zip(xyxy, class_ids, confidences)
+        ]
     
     def get_image_info(self, image_path: str) -> Dict[str, Any]:
         """
@@ -135,11 +494,7 @@ class YOLOv10Service:
             Dictionary with image information
         """
         try:
-            img = cv2.imread(image_path)
-            if img is None:
-                raise ValueError(f"Could not read image: {image_path}")
-            
-            height, width = img.shape[:2]
+            width, height = read_image_size(image_path)
             filename = os.path.basename(image_path)
             
             return {
@@ -190,8 +545,12 @@ def main():
     
     # Save results if output file specified
     if args.output:
-        with open(args.output, 'w') as f:
-            json.dump(results, f, indent=2)
+        if orjson is not None:
+            with open(args.output, 'wb') as f:
+                f.write(orjson.dumps(results, option=orjson.OPT_INDENT_2))
+        else:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2)
         print(f"\nResults saved to: {args.output}")
     
     return results
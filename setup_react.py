@@ -6,12 +6,17 @@ This script sets up the React frontend for both local development and Render dep
 It handles dependency installation, building, and verification.
 """
 
+import hashlib
 import os
 import sys
 import subprocess
 import shutil
 from pathlib import Path
 
+# Files and directories under web/ that feed into the production build
+BUILD_INPUTS = ["src", "public", "package.json", "package-lock.json",
+                "tailwind.config.js", "postcss.config.js"]
+
 def print_header():
     """Print setup header."""
     print("🚀 YOLOv10 React Frontend Setup")
@@ -34,13 +39,11 @@ def check_prerequisites():
         print("   Required version: 16.0.0 or higher")
         return False
     
-    try:
-        # Check npm
-        npm_version = subprocess.check_output(['npm', '--version'], 
-                                            stderr=subprocess.STDOUT, 
-                                            text=True).strip()
-        print(f"✅ npm: {npm_version}")
-    except (subprocess.CalledProcessError, FileNotFoundError):
+    # Check npm - a PATH lookup is enough, `npm --version` starts a whole Node process
+    npm_path = shutil.which('npm')
+    if npm_path:
+        print(f"✅ npm: {npm_path}")
+    else:
         print("❌ npm not found!")
         print("   Please install npm (usually comes with Node.js)")
         return False
@@ -48,6 +51,15 @@ def check_prerequisites():
     print()
     return True
 
+def dependency_hash():
+    """Hash package.json and package-lock.json to detect dependency changes."""
+    digest = hashlib.sha256()
+    for name in ("package.json", "package-lock.json"):
+        path = Path("web") / name
+        if path.exists():
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
 def install_dependencies():
     """Install React dependencies."""
     print("📦 Installing React dependencies...")
@@ -58,27 +70,35 @@ def install_dependencies():
         print("   Please run this script from the project root directory")
         return False
     
+    # Skip npm entirely if node_modules was installed from these exact manifests
+    stamp_file = web_dir / "node_modules" / ".install-stamp"
+    manifest_hash = dependency_hash()
+    if stamp_file.exists() and stamp_file.read_text() == manifest_hash:
+        print("✅ node_modules up to date, skipping install")
+        print()
+        return True
+    
     try:
-        # Change to web directory
-        os.chdir(web_dir)
-        
         # Install dependencies
         print("   Installing packages (this may take a few minutes)...")
-        result = subprocess.run(['npm', 'install'], 
-                              capture_output=True, 
-                              text=True, 
-                              check=True)
+        # npm ci installs exactly what the lockfile pins without re-resolving;
+        # skip the audit/funding requests either way
+        lock_file = web_dir / "package-lock.json"
+        command = ['npm', 'ci' if lock_file.exists() else 'install',
+                   '--prefer-offline', '--no-audit', '--no-fund']
+        env = {**os.environ, 'ADBLOCK': '1', 'DISABLE_OPENCOLLECTIVE': '1'}
+        
+        # Let npm write straight to the terminal so progress is visible
+        subprocess.run(command, cwd=web_dir, env=env, check=True)
+        stamp_file.write_text(manifest_hash)
         
         print("✅ Dependencies installed successfully!")
         print()
-        
-        # Go back to root
-        os.chdir("..")
         return True
         
     except subprocess.CalledProcessError as e:
         print(f"❌ Failed to install dependencies: {e}")
-        print(f"   Error output: {e.stderr}")
+        print("   See the npm output above for details")
         return False
     except Exception as e:
         print(f"❌ Unexpected error: {e}")
@@ -89,26 +109,24 @@ def build_react_app():
     print("🔨 Building React app for production...")
     
     try:
-        # Change to web directory
-        os.chdir("web")
-        
         # Build the app
         print("   Building production bundle...")
-        result = subprocess.run(['npm', 'run', 'build'], 
-                              capture_output=True, 
-                              text=True, 
-                              check=True)
+        # Give webpack a larger V8 heap so big bundles don't spend the build in GC.
+        # CI=true is deliberately not set: react-scripts would fail on lint warnings.
+        env = dict(os.environ)
+        if 'max-old-space-size' not in env.get('NODE_OPTIONS', ''):
+            env['NODE_OPTIONS'] = f"{env.get('NODE_OPTIONS', '')} --max-old-space-size=4096".strip()
+        
+        # Let npm write straight to the terminal so progress is visible
+        subprocess.run(['npm', 'run', 'build'], cwd="web", env=env, check=True)
         
         print("✅ React app built successfully!")
         print()
-        
-        # Go back to root
-        os.chdir("..")
         return True
         
     except subprocess.CalledProcessError as e:
         print(f"❌ Failed to build React app: {e}")
-        print(f"   Error output: {e.stderr}")
+        print("   See the npm output above for details")
         return False
     except Exception as e:
         print(f"❌ Unexpected error: {e}")
@@ -119,10 +137,11 @@ def verify_build():
     print("🔍 Verifying build...")
     
     build_dir = Path("web/build")
+    # react-scripts adds a content hash to bundle names (main.<hash>.js)
     required_files = [
         "index.html",
-        "static/js/main.js",
-        "static/css/main.css"
+        "static/js/main.*.js",
+        "static/css/main.*.css"
     ]
     
     if not build_dir.exists():
@@ -131,7 +150,7 @@ def verify_build():
     
     missing_files = []
     for file_path in required_files:
-        if not (build_dir / file_path).exists():
+        if next(build_dir.glob(file_path), None) is None:
             missing_files.append(file_path)
     
     if missing_files:
@@ -143,19 +162,46 @@ def verify_build():
     print()
     return True
 
+def build_is_fresh():
+    """Check whether web/build is newer than every frontend source file."""
+    web_dir = Path("web")
+    try:
+        built_at = (web_dir / "build" / "index.html").stat().st_mtime
+    except OSError:
+        return False
+    
+    for name in BUILD_INPUTS:
+        path = web_dir / name
+        if not path.exists():
+            continue
+        paths = path.rglob("*") if path.is_dir() else [path]
+        if any(p.stat().st_mtime > built_at for p in paths):
+            return False
+    return True
+
 def cleanup_old_builds():
-    """Clean up old build files if they exist."""
-    print("🧹 Cleaning up old builds...")
+    """Drop the persistent bundler cache when the npm dependencies change."""
+    print("🧹 Checking build cache...")
     
-    build_dir = Path("web/build")
-    if build_dir.exists():
-        try:
-            shutil.rmtree(build_dir)
-            print("✅ Old build files cleaned up")
-        except Exception as e:
-            print(f"⚠️  Warning: Could not clean old build: {e}")
-    else:
-        print("   No old build files found")
+    # react-scripts empties web/build itself and keeps webpack/babel caches in
+    # node_modules/.cache, so only that cache needs invalidating on dependency changes
+    cache_dir = Path("web/node_modules/.cache")
+    stamp_file = cache_dir / ".web-build.lockhash"
+    
+    lock_hash = dependency_hash()
+    if stamp_file.exists() and stamp_file.read_text() == lock_hash:
+        print("   Build cache is current")
+        print()
+        return
+    
+    try:
+        if cache_dir.exists():
+            shutil.rmtree(cache_dir)
+            print("✅ Stale build cache cleared")
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        stamp_file.write_text(lock_hash)
+    except Exception as e:
+        print(f"⚠️  Warning: Could not reset build cache: {e}")
     
     print()
 
@@ -196,23 +242,31 @@ def print_failure():
     print("   - Ensure all prerequisites are met")
     print("   - Try running the setup again")
 
-def main():
+def main(force=False):
     """Main setup function."""
     print_header()
     
+    # Reuse the existing build if no source has changed since
+    if not force and build_is_fresh():
+        print("✅ React build is up to date (run with --force to rebuild)")
+        print()
+        if verify_build():
+            print_success()
+            return True
+    
     # Check prerequisites
     if not check_prerequisites():
         print_failure()
         return False
     
-    # Clean up old builds
-    cleanup_old_builds()
-    
     # Install dependencies
     if not install_dependencies():
         print_failure()
         return False
     
+    # Reset the bundler cache if dependencies changed
+    cleanup_old_builds()
+    
     # Build React app
     if not build_react_app():
         print_failure()
@@ -229,7 +283,7 @@ def main():
 
 if __name__ == "__main__":
     try:
-        success = main()
+        success = main(force="--force" in sys.argv[1:])
         sys.exit(0 if success else 1)
     except KeyboardInterrupt:
         print("\n\n⚠️  Setup interrupted by user")
@@ -4,11 +4,21 @@ YOLOv10 Web Application Startup Script
 Simple and clean startup script for the object detection web app.
 """
 
+import importlib.util
 import os
 import sys
+import socket
+import threading
 import webbrowser
 import time
 
+# Make the web app and YOLOv10 modules importable, resolved from this file
+# rather than the working directory and added only once
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+for _path in (os.path.join(ROOT_DIR, 'web'), os.path.join(ROOT_DIR, 'YOLOv10')):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
 def check_dependencies():
     """Check if all required dependencies are available."""
     print("🔍 Checking dependencies...")
@@ -25,11 +35,12 @@ def check_dependencies():
     
     missing_packages = []
     
+    # find_spec only locates each package; importing them here would load
+    # torch and OpenCV just to check they exist
     for package, import_name in required_packages.items():
-        try:
-            __import__(import_name)
+        if importlib.util.find_spec(import_name) is not None:
             print(f"  ✅ {package}")
-        except ImportError:
+        else:
             print(f"  ❌ {package} (missing)")
             missing_packages.append(package)
     
@@ -45,23 +56,29 @@ def check_react_setup():
     """Check React frontend setup."""
     print("\n⚛️  Checking React frontend...")
     
+    # One directory listing answers all three checks below
+    try:
+        web_entries = {entry.name for entry in os.scandir('web')}
+    except FileNotFoundError:
+        web_entries = set()
+    
     # Check if package.json exists
     package_json_path = 'web/package.json'
-    if not os.path.exists(package_json_path):
+    if 'package.json' not in web_entries:
         print(f"  ❌ {package_json_path} (missing)")
         print("  React frontend not set up. Please run: python setup_react.py")
         return False
     
     # Check if node_modules exists
     node_modules_path = 'web/node_modules'
-    if not os.path.exists(node_modules_path):
+    if 'node_modules' not in web_entries:
         print(f"  ⚠️  {node_modules_path} (missing)")
         print("  React dependencies not installed. Please run: python setup_react.py")
         return False
     
     # Check if build exists
     build_path = 'web/build'
-    if not os.path.exists(build_path):
+    if 'build' not in web_entries:
         print(f"  ⚠️  {build_path} (missing)")
         print("  React app not built. Please run: python setup_react.py")
         return False
@@ -141,6 +158,26 @@ def download_model():
         print(f"❌ Error downloading YOLOv10 model: {e}")
         return False
 
+def open_browser_when_ready(port, timeout=30.0):
+    """Open the app in a browser once the server is listening on the given port."""
+    url = f'http://localhost:{port}'
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.1):
+                break
+        except OSError:
+            time.sleep(0.05)
+    else:
+        print(f"📱 Please open your browser and go to: {url}")
+        return
+    
+    try:
+        webbrowser.open(url)
+        print("🌐 Opening browser automatically...")
+    except Exception:
+        print(f"📱 Please open your browser and go to: {url}")
+
 def main():
     """Main startup function."""
     print("🚀 YOLOv10 Web Application")
@@ -169,33 +206,41 @@ def main():
     print("🔄 Press Ctrl+C to stop the server")
     print("=" * 40)
     
-    # Wait a moment for user to read
-    time.sleep(2)
-    
-    # Try to open browser automatically
-    try:
-        webbrowser.open('http://localhost:5000')
-        print("🌐 Opening browser automatically...")
-    except:
-        print("📱 Please open your browser and go to: http://localhost:5000")
-    
     # Start the Flask application
     try:
-        # Add web directory to Python path
-        sys.path.insert(0, os.path.join(os.getcwd(), 'web'))
-        # Add YOLOv10 directory to Python path
-        sys.path.insert(0, os.path.join(os.getcwd(), 'YOLOv10'))
-        
-        from app import app
+        from app import app, initialize_yolo
         
         # Production settings - use environment variable for port
         port = int(os.environ.get('PORT', 5000))
         debug_mode = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
         
+        # In debug mode the reloader re-runs this script in a child process
+        # (WERKZEUG_RUN_MAIN set) that serves requests, while this process only
+        # watches for changes: load the model in the child, open the browser once
+        reloader_child = os.environ.get('WERKZEUG_RUN_MAIN') == 'true'
+        
+        # Load and warm up the model once, before the first request arrives
+        if (not debug_mode or reloader_child) and not initialize_yolo():
+            print("\n❌ Cannot start application: YOLO model failed to initialize.")
+            return False
+        
         print(f"🌍 Server will run on port: {port}")
         print(f"🐛 Debug mode: {debug_mode}")
         
-        app.run(debug=debug_mode, host='0.0.0.0', port=port)
+        # Open the browser as soon as the server accepts connections
+        if not reloader_child:
+            threading.Thread(target=open_browser_when_ready, args=(port,), daemon=True).start()
+        
+        # Outside debug mode, serve with waitress (a production WSGI server that
+        # also runs on Windows) in this process, so the loaded model is reused
+        if not debug_mode and importlib.util.find_spec('waitress') is not None:
+            from waitress import serve
+            threads = int(os.environ.get('WAITRESS_THREADS', 8))
+            print(f"🧵 Serving with waitress ({threads} threads)")
+            serve(app, host='0.0.0.0', port=port, threads=threads)
+        else:
+            # threaded lets concurrent uploads share model calls through the batcher
+            app.run(debug=debug_mode, use_reloader=debug_mode, threaded=True, host='0.0.0.0', port=port)
     except KeyboardInterrupt:
         print("\n\n🛑 Server stopped by user")
     except Exception as e:
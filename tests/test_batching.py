@@ -0,0 +1,68 @@
+"""
+Tests that batching never changes what one image or one request gets back.
+"""
+
+import os
+import sys
+
+import cv2
+import pytest
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT_DIR, 'web'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'YOLOv10'))
+
+from inference_batcher import InferenceBatcher
+
+MODEL_PATH = os.path.join(ROOT_DIR, 'yolov10n.pt')
+
+
+@pytest.fixture(scope='module')
+def service():
+    """YOLOv10 service on the shipped weights."""
+    if not os.path.exists(MODEL_PATH):
+        pytest.skip('yolov10n.pt not available')
+    from yolov10_service import YOLOv10Service
+    return YOLOv10Service(MODEL_PATH, os.path.join(ROOT_DIR, 'YOLOv10', 'config.yaml'))
+
+
+@pytest.fixture(scope='module')
+def image_paths():
+    """Two sample images of different sizes bundled with Ultralytics."""
+    import ultralytics
+    assets = os.path.join(os.path.dirname(ultralytics.__file__), 'assets')
+    return os.path.join(assets, 'bus.jpg'), os.path.join(assets, 'zidane.jpg')
+
+
+@pytest.fixture(scope='module')
+def images(image_paths):
+    """The sample images decoded as BGR arrays."""
+    return tuple(cv2.imread(path) for path in image_paths)
+
+
+def test_detections_do_not_depend_on_batch_neighbours(service, images):
+    bus, zidane = images
+    
+    alone = service.predict_frames([bus])[0]
+    batched = service.predict_frames([bus, zidane])
+    
+    assert batched[0] == alone
+    assert batched[1] == service.predict_frames([zidane])[0]
+
+
+def test_directory_batches_match_single_image_runs(service, image_paths):
+    assert service.predict_batch(list(image_paths)) == [service.predict(path) for path in image_paths]
+
+
+def test_failed_batch_only_fails_the_bad_item():
+    def batch(items):
+        if 'bad' in items:
+            raise ValueError('bad input')
+        return [item.upper() for item in items]
+    
+    batcher = InferenceBatcher(batch, max_batch=8, wait_ms=200)
+    good, bad = batcher.submit('good'), batcher.submit('bad')
+    
+    assert good.result(timeout=5) == 'GOOD'
+    with pytest.raises(ValueError):
+        bad.result(timeout=5)
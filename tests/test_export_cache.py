@@ -0,0 +1,68 @@
+"""
+Tests that an exported model is only reused for the exact weights it was built from.
+"""
+
+import os
+import shutil
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'YOLOv10'))
+
+import yolov10_service
+from yolov10_service import YOLOv10Service
+
+
+class _FakeYOLO:
+    """Stand-in for ultralytics.YOLO whose export writes a placeholder file."""
+    
+    exports = []
+    
+    def __init__(self, model_path):
+        self.model_path = model_path
+    
+    def export(self, **kwargs):
+        exported = os.path.splitext(self.model_path)[0] + '.onnx'
+        with open(exported, 'w') as f:
+            f.write('exported')
+        _FakeYOLO.exports.append(self.model_path)
+        return exported
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    """Service configured for ONNX export of weights in tmp_path, without loading a model."""
+    monkeypatch.setattr(yolov10_service, 'YOLO', _FakeYOLO)
+    _FakeYOLO.exports = []
+    weights = tmp_path / 'model.pt'
+    weights.write_bytes(b'new weights')
+    
+    service = YOLOv10Service.__new__(YOLOv10Service)
+    service.model_path = str(weights)
+    service.config = {'model_config': {'export': 'onnx'}}
+    service._predict_args = {'device': 'cpu', 'half': False}
+    return service
+
+
+def test_export_is_reused_for_unchanged_weights(service):
+    first = service._exported_model_path()
+    second = service._exported_model_path()
+    
+    assert first == second
+    assert len(_FakeYOLO.exports) == 1
+
+
+def test_weights_replaced_by_older_file_are_re_exported(service, tmp_path):
+    exported = service._exported_model_path()
+    
+    # Replace the weights the way cp -p / rsync -t do: new content, older mtime
+    old_weights = tmp_path / 'old.pt'
+    old_weights.write_bytes(b'old weights, different size')
+    os.utime(old_weights, ns=(1_000_000_000, 1_000_000_000))
+    shutil.copy2(old_weights, service.model_path)
+    assert os.stat(service.model_path).st_mtime_ns < os.stat(exported).st_mtime_ns
+    
+    service._exported_model_path()
+    
+    assert len(_FakeYOLO.exports) == 2
@@ -0,0 +1,98 @@
+"""
+Tests that only successful model calls reach the web app's prediction cache.
+"""
+
+import hashlib
+import io
+import os
+import sys
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'web'))
+
+import app as web_app
+from inference_batcher import InferenceBatcher
+from prediction_cache import PredictionCache
+from cvat_integration import CVATIntegration
+from yolov10_service import YOLOv10Service
+
+
+def _jpeg_bytes(height=32, width=32):
+    """Encode a blank image as JPEG."""
+    ok, encoded = cv2.imencode('.jpg', np.zeros((height, width, 3), dtype=np.uint8))
+    assert ok
+    return encoded.tobytes()
+
+
+def _integration(run_model):
+    """CVAT integration whose YOLO service calls run_model instead of a real model."""
+    service = YOLOv10Service.__new__(YOLOv10Service)
+    service._labels_by_id = ['person']
+    service._run_model = run_model
+    integration = CVATIntegration.__new__(CVATIntegration)
+    integration.yolo_service = service
+    return integration
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Flask test client with a fresh cache and no uploads written to disk."""
+    monkeypatch.setitem(web_app.app.config, 'SAVE_UPLOADS', False)
+    monkeypatch.setattr(web_app, 'prediction_cache', PredictionCache(8))
+    monkeypatch.setattr(web_app, 'inference_batcher', InferenceBatcher(web_app.predict_uploads))
+    return web_app.app.test_client()
+
+
+def _upload(client, image_bytes):
+    return client.post('/api/upload', data={'file': (io.BytesIO(image_bytes), 'blank.jpg')},
+                       content_type='multipart/form-data')
+
+
+def test_failed_inference_is_not_cached(client, monkeypatch):
+    def failing_model(source, **kwargs):
+        raise RuntimeError('CUDA out of memory')
+    
+    monkeypatch.setattr(web_app, 'cvat_integration', _integration(failing_model))
+    image_bytes = _jpeg_bytes()
+    
+    response = _upload(client, image_bytes)
+    
+    assert response.status_code == 500
+    assert web_app.prediction_cache.get(hashlib.sha256(image_bytes).digest()) is None
+
+
+def test_successful_inference_is_cached(client, monkeypatch):
+    def empty_model(source, **kwargs):
+        return iter([SimpleNamespace(boxes=None) for _ in source])
+    
+    monkeypatch.setattr(web_app, 'cvat_integration', _integration(empty_model))
+    image_bytes = _jpeg_bytes()
+    
+    response = _upload(client, image_bytes)
+    
+    assert response.status_code == 200
+    assert web_app.prediction_cache.get(hashlib.sha256(image_bytes).digest()) == []
+
+
+def test_cached_detections_never_come_from_mixed_shape_batches(client, monkeypatch):
+    batch_shapes = []
+    
+    def recording_model(source, **kwargs):
+        batch_shapes.append({frame.shape for frame in source})
+        return iter([SimpleNamespace(boxes=None) for _ in source])
+    
+    monkeypatch.setattr(web_app, 'cvat_integration', _integration(recording_model))
+    small, large = _jpeg_bytes(32, 32), _jpeg_bytes(48, 64)
+    
+    response = client.post('/api/batch-upload',
+                           data={'file': [(io.BytesIO(small), 'small.jpg'), (io.BytesIO(large), 'large.jpg')]},
+                           content_type='multipart/form-data')
+    
+    assert response.status_code == 200
+    assert all(len(shapes) == 1 for shapes in batch_shapes)
+    for image_bytes in (small, large):
+        assert web_app.prediction_cache.get(hashlib.sha256(image_bytes).digest()) == []
@@ -5,18 +5,45 @@ A clean, organized Flask web application for AI-powered object detection.
 """
 
 import os
-import base64
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from flask import Flask, request, jsonify, send_from_directory, render_template
+from flask import Flask, Response, request, jsonify, send_from_directory, render_template
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 import cv2
+import numpy as np
 
 import sys
 import os
-# Add YOLOv10 directory to path for imports
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'YOLOv10'))
+# Add YOLOv10 directory to path for imports (once, even if start.py already did)
+yolo_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'YOLOv10'))
+if yolo_dir not in sys.path:
+    sys.path.insert(0, yolo_dir)
 from cvat_integration import CVATIntegration
+from inference_batcher import InferenceBatcher
+from prediction_cache import PredictionCache
+
+# Optional orjson for faster (and numpy-aware) JSON responses
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Optional SIMD base64 encoder for the image payloads
+try:
+    from pybase64 import b64encode
+except ImportError:
+    from base64 import b64encode
+
+# Optional libjpeg-turbo bindings for faster JPEG decode/encode
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+    turbo_jpeg = TurboJPEG()
+except (ImportError, OSError, RuntimeError):
+    turbo_jpeg = None
 
 # ============================================================================
 # APPLICATION CONFIGURATION
@@ -29,6 +56,23 @@ build_dir = os.path.join(web_dir, 'build')
 app = Flask(__name__, static_folder=build_dir, static_url_path='')
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider that serializes with orjson."""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(
+            obj, default=self.default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        ).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+# Use orjson for JSON responses when it is installed
+if orjson is not None:
+    app.json = OrjsonProvider(app)
+
 # Configure CORS for production
 CORS(app, origins=[
     "http://localhost:3000",  # Local development
@@ -38,15 +82,51 @@ CORS(app, origins=[
 ])
 
 # File upload configuration
-UPLOAD_FOLDER = 'uploads'
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'tiff'}
+# Absolute, so saving and serving (/uploads) agree whatever the working directory
+UPLOAD_FOLDER = os.path.join(os.path.abspath(web_dir), 'uploads')
+ALLOWED_EXTENSIONS = frozenset({'png', 'jpg', 'jpeg', 'gif', 'bmp', 'tiff'})
+ALLOWED_SUFFIXES = tuple('.' + extension for extension in ALLOWED_EXTENSIONS)  # for str.endswith
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
+# Browser cache lifetime for /uploads responses (seconds)
+UPLOAD_CACHE_MAX_AGE = 24 * 60 * 60
+
+# Let a fronting nginx/Apache stream /uploads files via X-Sendfile
+# (only enable when the proxy is configured for it)
+app.use_x_sendfile = os.environ.get('USE_X_SENDFILE', 'false').lower() == 'true'
+
+# Browser cache lifetime for build/static assets; react-scripts puts a content
+# hash in every file name there, so a changed file always gets a new URL
+STATIC_CACHE_MAX_AGE = 365 * 24 * 60 * 60
+
+# JPEG quality of the annotated preview (OpenCV defaults to 95)
+ANNOTATED_JPEG_QUALITY = 85
+
+# Uploads are decoded in memory; keep a copy on disk (served from /uploads) unless disabled
+app.config['SAVE_UPLOADS'] = os.environ.get('SAVE_UPLOADS', 'true').lower() == 'true'
+
 # Ensure upload directory exists
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-# Global CVAT integration instance
+# Concurrent uploads arriving within BATCH_WAIT_MS share one model call
+BATCH_MAX = int(os.environ.get('BATCH_MAX', 8))
+BATCH_WAIT_MS = float(os.environ.get('BATCH_WAIT_MS', 5))
+INFERENCE_TIMEOUT = 120  # seconds
+
+# Blank inferences at startup so the first request is not the slow one; only
+# the long-running server warms up, the one-shot CLIs skip it
+WARMUP_RUNS = int(os.environ.get('WARMUP_RUNS', 1))
+
+# Detections of recent uploads by content hash, so identical re-uploads skip the model
+prediction_cache = PredictionCache(int(os.environ.get('PREDICTION_CACHE_SIZE', 128)))
+
+# Threads that annotate and encode the images of a multi-file upload
+annotate_pool = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1),
+                                   thread_name_prefix='annotate')
+
+# Global CVAT integration instance and the batcher feeding it
 cvat_integration = None
+inference_batcher = None
 
 # ============================================================================
 # UTILITY FUNCTIONS
@@ -54,17 +134,23 @@ cvat_integration = None
 
 def allowed_file(filename):
     """Check if file extension is allowed."""
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return filename.lower().endswith(ALLOWED_SUFFIXES)
 
 def initialize_yolo():
     """Initialize YOLO model."""
-    global cvat_integration
+    global cvat_integration, inference_batcher
     if cvat_integration is None:
         try:
             config_path = os.path.join(os.path.dirname(__file__), '..', 'YOLOv10', 'config.yaml')
-            cvat_integration = CVATIntegration(config_path)
-            cvat_integration.initialize_yolo_service()
+            integration = CVATIntegration(config_path)
+            integration.initialize_yolo_service()
+            
+            # The service already ran model_config.warmup if the config asks for it
+            if not integration.yolo_service.config.get('model_config', {}).get('warmup'):
+                integration.yolo_service.warmup(WARMUP_RUNS)
+            
+            inference_batcher = InferenceBatcher(predict_uploads, BATCH_MAX, BATCH_WAIT_MS)
+            cvat_integration = integration
             print("✅ YOLO model initialized successfully")
             return True
         except Exception as e:
@@ -72,50 +158,101 @@ def initialize_yolo():
             return False
     return True
 
-def encode_image_to_base64(image_path):
-    """Encode image to base64 for frontend display."""
-    try:
-        with open(image_path, "rb") as image_file:
-            encoded_string = base64.b64encode(image_file.read()).decode('utf-8')
-            return encoded_string
-    except Exception as e:
-        print(f"Error encoding image: {e}")
-        return None
+def predict_uploads(uploads):
+    """Run (image, filename) pairs from concurrent requests as one batch."""
+    frames = [image for image, _ in uploads]
+    filenames = [filename for _, filename in uploads]
+    # Raise on model errors so every future in the batch fails and
+    # nothing from a failed call reaches the prediction cache
+    return cvat_integration.predict_frames(frames, filenames, batch_size=len(uploads),
+                                           raise_errors=True)
+
+def jpeg_has_exif(data):
+    """Check whether JPEG bytes carry an EXIF segment (which may set an orientation)."""
+    pos = 2
+    while pos + 4 <= len(data) and data[pos] == 0xFF:
+        marker = data[pos + 1]
+        if marker == 0xDA:  # start of scan: no more metadata segments
+            break
+        if marker == 0xE1 and data[pos + 4:pos + 8] == b'Exif':
+            return True
+        pos += 2 + int.from_bytes(data[pos + 2:pos + 4], 'big')
+    return False
+
+def decode_image(image_bytes):
+    """Decode uploaded image bytes to a BGR array, or None if they are not an image."""
+    # TurboJPEG ignores EXIF orientation, so rotated photos still go through
+    # OpenCV to keep the same pixels cv2.imread would produce
+    if turbo_jpeg is not None and image_bytes[:2] == b'\xff\xd8' and not jpeg_has_exif(image_bytes):
+        try:
+            return turbo_jpeg.decode(image_bytes, pixel_format=TJPF_BGR)
+        except OSError:
+            pass
+    return cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+
+def encode_jpeg(image, quality):
+    """Encode a BGR array as JPEG bytes."""
+    if turbo_jpeg is not None:
+        return turbo_jpeg.encode(image, quality=quality, pixel_format=TJPF_BGR)
+    _, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer
 
-def draw_detections_on_image(image_path, detections):
-    """Draw bounding boxes on image and return base64 encoded result."""
+def annotate_image(image, detections):
+    """Draw bounding boxes and labels on a decoded BGR image in place."""
+    # Draw all bounding boxes with one polylines call: each xyxy box
+    # becomes its four corners as an (N, 4, 2) int32 array
+    boxes = np.asarray([detection['bbox'] for detection in detections],
+                       dtype=np.float64).reshape(-1, 4).astype(np.int32)
+    corners = boxes[:, [[0, 1], [2, 1], [2, 3], [0, 3]]]
+    cv2.polylines(image, list(corners), True, (0, 255, 0), 2)
+    
+    # Draw labels
+    for detection, (x1, y1, _, _) in zip(detections, boxes.tolist()):
+        label_text = f"{detection['label']}: {detection['confidence']:.2f}"
+        cv2.putText(image, label_text, (x1, y1-10), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+    return image
+
+def draw_detections_on_image(image, detections):
+    """Draw bounding boxes on a decoded BGR image in place and return it base64 encoded."""
     try:
-        # Read image
-        image = cv2.imread(image_path)
-        if image is None:
-            return None
-        
-        # Draw detections
-        for detection in detections:
-            x1, y1, x2, y2 = detection['bbox']
-            label = detection['label']
-            confidence = detection['confidence']
-            
-            # Convert coordinates to integers
-            x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-            
-            # Draw bounding box
-            cv2.rectangle(image, (x1, y1), (x2, y2), (0, 255, 0), 2)
-            
-            # Draw label
-            label_text = f"{label}: {confidence:.2f}"
-            cv2.putText(image, label_text, (x1, y1-10), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+        annotate_image(image, detections)
         
         # Convert to base64
-        _, buffer = cv2.imencode('.jpg', image)
-        img_base64 = base64.b64encode(buffer).decode('utf-8')
+        buffer = encode_jpeg(image, ANNOTATED_JPEG_QUALITY)
+        img_base64 = b64encode(buffer).decode('ascii')
         return img_base64
         
     except Exception as e:
         print(f"Error drawing detections: {e}")
         return None
 
+def format_detections(detections):
+    """Keep the detection fields sent to the client, with rounded confidences."""
+    return [
+        {
+            'label': detection['label'],
+            'bbox': detection['bbox'],
+            'confidence': round(detection['confidence'], 3)
+        }
+        for detection in detections
+    ]
+
+def build_detection_response(filename, image_bytes, annotated_image, image_info, detections):
+    """Build the JSON response for one processed upload from its bytes and annotated preview."""
+    return {
+        'success': True,
+        'filename': filename,
+        'original_image': b64encode(image_bytes).decode('ascii'),
+        'annotated_image': annotated_image,
+        'detections': detections,
+        'summary': {
+            'total_objects': len(detections),
+            'image_size': f"{image_info['width']}x{image_info['height']}",
+            'processing_time': '~1-2 seconds'
+        }
+    }
+
 # ============================================================================
 # ROUTES
 # ============================================================================
@@ -134,73 +271,156 @@ def index():
         # Fallback to the old template if React build doesn't exist
         return render_template('index.html')
 
+def process_uploads():
+    """Validate, decode and run every image sent under the 'file' field.
+    
+    All images are submitted to the inference batcher together, so a
+    multi-file request is run through the model as one batch.
+    
+    Returns:
+        (list of per-image response dicts, None), or (None, error response)
+    """
+    # Check if file was uploaded
+    if 'file' not in request.files:
+        return None, (jsonify({'error': 'No file provided'}), 400)
+    
+    files = [file for file in request.files.getlist('file') if file.filename != '']
+    if not files:
+        return None, (jsonify({'error': 'No file selected'}), 400)
+    
+    if not all(allowed_file(file.filename) for file in files):
+        return None, (jsonify({'error': 'Invalid file type'}), 400)
+    
+    # The model is normally loaded at startup; this only covers
+    # servers that import the app without running initialize_yolo()
+    if cvat_integration is None and not initialize_yolo():
+        return None, (jsonify({'error': 'Failed to initialize YOLO model'}), 500)
+    
+    # Decode each upload once, in memory; the same array is used for
+    # inference and drawing, and the raw bytes for the original image
+    # Nanosecond prefix: unique per request, so concurrent uploads of the same
+    # name within one second no longer overwrite each other's saved file
+    timestamp = f"{time.time_ns():x}"
+    filenames = []
+    uploads = []
+    frames = []
+    digests = []
+    for index, file in enumerate(files):
+        filename = secure_filename(file.filename)
+        filename = f"{timestamp}_{filename}" if len(files) == 1 else f"{timestamp}_{index}_{filename}"
+        image_bytes = file.read()
+        image = decode_image(image_bytes)
+        if image is None:
+            return None, (jsonify({'error': f'Could not read image: {file.filename}'}), 400)
+        
+        if app.config['SAVE_UPLOADS']:
+            with open(os.path.join(app.config['UPLOAD_FOLDER'], filename), 'wb') as f:
+                f.write(image_bytes)
+        
+        filenames.append(filename)
+        uploads.append(image_bytes)
+        frames.append(image)
+        digests.append(hashlib.sha256(image_bytes).digest())
+    
+    # Process images with YOLOv10, except those whose exact bytes were seen recently
+    print(f"Processing {len(filenames)} image(s): {', '.join(filenames)}")
+    cached = [prediction_cache.get(digest) for digest in digests]
+    futures = [
+        inference_batcher.submit(upload) if hit is None else None
+        for upload, hit in zip(zip(frames, filenames), cached)
+    ]
+    
+    predictions = []
+    for frame, filename, digest, hit, future in zip(frames, filenames, digests, cached, futures):
+        if future is not None:
+            image_info, detections = future.result(timeout=INFERENCE_TIMEOUT)
+            prediction_cache.put(digest, detections)
+        else:
+            image_info = {'filename': filename, 'width': frame.shape[1], 'height': frame.shape[0]}
+            detections = hit
+        predictions.append((image_info, detections))
+    
+    # Draw detections on each image; drawing and JPEG encoding release the
+    # GIL, so the images of a multi-file upload are annotated in parallel
+    detection_lists = [format_detections(detections) for _, detections in predictions]
+    if len(frames) > 1:
+        annotated_images = list(annotate_pool.map(draw_detections_on_image, frames, detection_lists))
+    else:
+        annotated_images = [draw_detections_on_image(frames[0], detection_lists[0])]
+    
+    responses = [
+        build_detection_response(filename, image_bytes, annotated_image, image_info, detections)
+        for filename, image_bytes, annotated_image, (image_info, _), detections
+        in zip(filenames, uploads, annotated_images, predictions, detection_lists)
+    ]
+    return responses, None
+
 @app.route('/api/upload', methods=['POST'])
 def upload_file():
-    """Handle file upload and process with YOLOv10."""
+    """Handle file upload and process with YOLOv10.
+    
+    Several images may be sent under the same 'file' field; they are run
+    through the model as one batch and answered with a 'results' list.
+    """
     try:
-        # Check if file was uploaded
-        if 'file' not in request.files:
-            return jsonify({'error': 'No file provided'}), 400
-        
-        file = request.files['file']
-        if file.filename == '':
-            return jsonify({'error': 'No file selected'}), 400
+        responses, error = process_uploads()
+        if error is not None:
+            return error
         
-        if file and allowed_file(file.filename):
-            # Initialize YOLO if not already done
-            if not initialize_yolo():
-                return jsonify({'error': 'Failed to initialize YOLO model'}), 500
-            
-            # Save uploaded file
-            filename = secure_filename(file.filename)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{timestamp}_{filename}"
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
-            
-            # Process image with YOLOv10
-            print(f"Processing image: {filepath}")
-            cvat_data = cvat_integration.predict_and_convert(filepath)
-            
-            # Extract detection results
-            annotation = cvat_data['annotations'][0]
-            detections = []
+        if len(responses) == 1:
+            return jsonify(responses[0])
+        return jsonify({'success': True, 'results': responses})
             
-            for shape in annotation['shapes']:
-                points = shape['points']
-                if len(points) >= 2:
-                    x1, y1 = points[0]
-                    x2, y2 = points[1]
-                    confidence = shape['attributes'][0]['value']
-                    
-                    detections.append({
-                        'label': shape['label'],
-                        'bbox': [x1, y1, x2, y2],
-                        'confidence': float(confidence)
-                    })
-            
-            # Draw detections on image
-            annotated_image = draw_detections_on_image(filepath, detections)
-            
-            # Prepare response
-            response = {
-                'success': True,
-                'filename': filename,
-                'original_image': encode_image_to_base64(filepath),
-                'annotated_image': annotated_image,
-                'detections': detections,
-                'summary': {
-                    'total_objects': len(detections),
-                    'image_size': f"{annotation['width']}x{annotation['height']}",
-                    'processing_time': '~1-2 seconds'
-                }
-            }
+    except Exception as e:
+        print(f"Error processing upload: {e}")
+        return jsonify({'error': f'Processing error: {str(e)}'}), 500
+
+@app.route('/api/batch-upload', methods=['POST'])
+def batch_upload():
+    """Process several images under the 'file' field as one model batch.
+    
+    Same as /api/upload, but always answers with a 'results' list, even
+    for a single image.
+    """
+    try:
+        responses, error = process_uploads()
+        if error is not None:
+            return error
+        
+        return jsonify({'success': True, 'results': responses})
             
-            return jsonify(response)
+    except Exception as e:
+        print(f"Error processing batch upload: {e}")
+        return jsonify({'error': f'Processing error: {str(e)}'}), 500
+
+@app.route('/api/annotate', methods=['POST'])
+def annotate_file():
+    """Run YOLOv10 on one uploaded image and return the annotated JPEG itself.
+    
+    For clients that only display the result: the JPEG is sent as the
+    response body instead of base64 inside JSON.
+    """
+    try:
+        file = request.files.get('file')
+        if file is None or file.filename == '':
+            return jsonify({'error': 'No file provided'}), 400
         
-        else:
+        if not allowed_file(file.filename):
             return jsonify({'error': 'Invalid file type'}), 400
-            
+        
+        if cvat_integration is None and not initialize_yolo():
+            return jsonify({'error': 'Failed to initialize YOLO model'}), 500
+        
+        image = decode_image(file.read())
+        if image is None:
+            return jsonify({'error': f'Could not read image: {file.filename}'}), 400
+        
+        filename = secure_filename(file.filename)
+        _, detections = inference_batcher.submit((image, filename)).result(timeout=INFERENCE_TIMEOUT)
+        annotate_image(image, detections)
+        
+        return Response(bytes(encode_jpeg(image, ANNOTATED_JPEG_QUALITY)), mimetype='image/jpeg')
+        
     except Exception as e:
         print(f"Error processing upload: {e}")
         return jsonify({'error': f'Processing error: {str(e)}'}), 500
@@ -216,8 +436,13 @@ def health_check():
 
 @app.route('/uploads/<filename>')
 def uploaded_file(filename):
-    """Serve uploaded files."""
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    """Serve uploaded files.
+    
+    Saved names carry their upload timestamp and are never rewritten, so
+    clients may cache them; If-None-Match/If-Modified-Since get a 304.
+    """
+    return send_from_directory(app.config['UPLOAD_FOLDER'], filename,
+                               conditional=True, max_age=UPLOAD_CACHE_MAX_AGE)
 
 
 
@@ -242,6 +467,18 @@ def serve_react(path):
         except FileNotFoundError:
             return "React app not built. Run 'npm run build' in the web directory.", 404
 
+@app.after_request
+def set_build_cache_headers(response):
+    """Cache hashed build assets for good; make browsers revalidate HTML so deploys show up."""
+    if request.path.startswith('/static/') and response.status_code in (200, 304):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_CACHE_MAX_AGE
+        response.cache_control.immutable = True
+    elif response.mimetype == 'text/html':
+        response.cache_control.no_cache = True
+    return response
+
 # ============================================================================
 # APPLICATION STARTUP
 # ============================================================================
@@ -254,6 +491,9 @@ if __name__ == '__main__':
     if initialize_yolo():
         print("✅ Backend ready!")
         print("🌐 Starting web server...")
-        app.run(debug=True, host='0.0.0.0', port=5000)
+        # The debugger and reloader stay off unless asked for; the reloader
+        # would start a second process and load the model again
+        debug_mode = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
+        app.run(debug=debug_mode, use_reloader=debug_mode, threaded=True, host='0.0.0.0', port=5000)
     else:
         print("❌ Failed to initialize backend")
@@ -0,0 +1,33 @@
+"""
+Gunicorn settings for serving the YOLOv10 web application in production.
+
+Run from the repository root (the model path in config.yaml is relative to it):
+
+    gunicorn -c web/gunicorn.conf.py app:app
+
+One worker with several threads keeps a single copy of the model in
+(GPU) memory; inference releases the GIL, so threads overlap decoding,
+drawing and I/O with it. Never combine this with Flask's debug mode.
+"""
+
+import os
+
+# Make `app:app` importable from the repository root
+pythonpath = os.path.dirname(os.path.abspath(__file__))
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = 1
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+timeout = 120
+
+# Import Flask, torch and Ultralytics once in the master before forking
+preload_app = True
+
+
+def post_worker_init(worker):
+    """Load the model inside the worker: a CUDA context does not survive fork()."""
+    from app import initialize_yolo
+    
+    if not initialize_yolo():
+        worker.log.error("YOLO model failed to initialize")
@@ -0,0 +1,81 @@
+"""
+Micro-batching of inference requests across concurrent uploads.
+Requests that arrive within a short window share one model call.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List
+
+
+class InferenceBatcher:
+    """Collect items from many threads and run them through one batch function."""
+    
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]],
+                 max_batch: int = 8, wait_ms: float = 5.0):
+        """
+        Start the background batching thread.
+        
+        Args:
+            batch_fn: Function mapping a list of items to a list of results in the same order
+            max_batch: Maximum number of items per call to batch_fn
+            wait_ms: How long to wait for more items after the first one arrives
+        """
+        self._batch_fn = batch_fn
+        self._max_batch = max_batch
+        self._wait = wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='inference-batcher', daemon=True)
+        self._thread.start()
+    
+    def submit(self, item: Any) -> Future:
+        """
+        Queue an item for the next batch.
+        
+        Args:
+            item: Input passed to batch_fn as part of a list
+            
+        Returns:
+            Future resolving to this item's result
+        """
+        future = Future()
+        self._queue.put((item, future))
+        return future
+    
+    def _run(self):
+        """Gather up to max_batch items within the wait window and process them together."""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self._wait
+            while len(batch) < self._max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            try:
+                results = self._batch_fn([item for item, _ in batch])
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0][1].set_exception(e)
+                    continue
+                # One bad item must not fail the requests merged with it:
+                # retry each item on its own and fail only those that still raise
+                for item, future in batch:
+                    self._run_single(item, future)
+                continue
+            
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+    
+    def _run_single(self, item: Any, future: Future):
+        """Run batch_fn on one item and resolve its future with the result or error."""
+        try:
+            future.set_result(self._batch_fn([item])[0])
+        except Exception as e:
+            future.set_exception(e)
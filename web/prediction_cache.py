@@ -0,0 +1,55 @@
+"""
+Least-recently-used cache of model detections keyed by upload content.
+Re-uploads of identical bytes (retries, repeated test images) skip inference.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class PredictionCache:
+    """Thread-safe LRU mapping from an upload's content digest to its detections."""
+    
+    def __init__(self, maxsize: int = 128):
+        """
+        Create an empty cache.
+        
+        Args:
+            maxsize: Number of entries kept; 0 disables caching
+        """
+        self._maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: bytes) -> Optional[Any]:
+        """
+        Look up a cached value and mark it as recently used.
+        
+        Args:
+            key: Content digest of the upload
+        
+        Returns:
+            The cached value, or None on a miss
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+    
+    def put(self, key: bytes, value: Any):
+        """
+        Store a value, evicting the least recently used entry when full.
+        
+        Args:
+            key: Content digest of the upload
+            value: Value to cache
+        """
+        if self._maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)